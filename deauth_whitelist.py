@@ -7,20 +7,200 @@ It integrates with the web UI through the webhook system to allow adding/removin
 Compatible with Pwnagotchi versions that support the webhook system.
 """
 
+import atexit
+import bisect
+import functools
+import gzip
+import hashlib
+import heapq
 import os
 import json
 import logging
+import queue
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pwnagotchi
 import pwnagotchi.plugins as plugins
 from pwnagotchi.utils import StatusFile
 
 # Import Flask components only when needed to avoid import errors
 try:
-    from flask import render_template_string, request, jsonify, redirect, url_for
+    from flask import request, session, Response, current_app
+    from markupsafe import Markup
     FLASK_AVAILABLE = True
 except ImportError:
     FLASK_AVAILABLE = False
     logging.warning("[deauth_whitelist] Flask not available, web interface disabled")
 
+# Use a faster JSON library for the whitelist file and API responses when one is installed
+try:
+    import orjson
+
+    # orjson already returns compact UTF-8 bytes, so it is used without a wrapper
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+
+        def _json_dumps(obj):
+            return ujson.dumps(obj).encode('utf-8')
+
+        _json_loads = ujson.loads
+    except ImportError:
+        def _json_dumps(obj):
+            return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+        _json_loads = json.loads
+
+# Stream large session files when ijson is installed
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Maximum number of session files (the most recently modified) read per directory
+SESSION_LIMIT = 10
+
+# Read buffer (in bytes) for streamed session files, so ijson's chunked reads don't each hit the SD card
+SESSION_READ_BUFFER = 1 << 20
+
+# Delay (in seconds) used to coalesce bursts of whitelist changes into a single write
+FLUSH_DELAY = 0.5
+
+# Age (in seconds) after which the cached /api/nearby response is rebuilt in the background
+NEARBY_TTL = 5
+
+# Maximum number of networks returned by /api/nearby
+NEARBY_LIMIT = 50
+
+# Cache-Control for the JSON API, clients revalidate with the ETag once it expires
+API_CACHE_CONTROL = 'private, max-age=5'
+
+# Cache-Control for the stylesheet and script, whose URLs change with their content
+STATIC_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Prebuilt bodies for the common empty answers of /api/list and /api/nearby
+_EMPTY_LIST_JSON = b'{"whitelist":[]}'
+_EMPTY_NEARBY_JSON = b'{"networks":[]}'
+_EMPTY_NEARBY_ETAG = '"' + hashlib.blake2b(_EMPTY_NEARBY_JSON, digest_size=8).hexdigest() + '"'
+
+# Stands in for the inline nearby networks while the page markup is rendered and cached
+_INITIAL_PLACEHOLDER = '/*deauth_whitelist:initial*/'
+
+# Smallest JSON body (in bytes) worth gzipping for clients that accept it
+GZIP_MIN_SIZE = 512
+
+# Header sets passed to responses in one go instead of being assigned one by one
+_CORS_HEADERS = (('Access-Control-Allow-Origin', '*'),)
+_CORS_API_HEADERS = _CORS_HEADERS + (('Access-Control-Allow-Methods', 'POST, GET, OPTIONS'),
+                                     ('Access-Control-Allow-Headers', 'Content-Type, X-Requested-With'))
+_STATIC_HEADERS = (('Cache-Control', STATIC_CACHE_CONTROL), ('Vary', 'Accept-Encoding'))
+_GZIP_HEADERS = (('Content-Encoding', 'gzip'),)
+_PAGE_HEADERS = (('Vary', 'Accept-Encoding'),)
+
+# Places Pwnagotchi keeps handshakes (only the first one found is read) and session files
+HANDSHAKE_DIRS = ['/root/handshakes', '/home/pi/handshakes', '/opt/pwnagotchi/handshakes', '/var/lib/pwnagotchi/handshakes']
+SESSION_DIRS = ['/root', '/home/pi', '/opt/pwnagotchi', '/var/lib/pwnagotchi']
+
+# Age (in seconds) after which the cached WiFi scan is refreshed in the background
+SCAN_TTL = 30
+
+# Entries that look like a MAC address in any common notation (aa:bb.., AA-BB.., aabb.., aabb.ccdd..),
+# compiled once with one capture group per octet
+_MAC_RE = re.compile(r'^' + r'[:._-]?'.join([r'([0-9a-fA-F]{2})'] * 6) + r'$')
+
+# Handshake capture file names (ESSID_MAC_timestamp.pcap), capturing the ESSID and MAC
+_PCAP_NAME_RE = re.compile(r'^([^_]+)_([^_.]+)')
+
+# Lowercase ESSIDs written for hidden networks, which are not real names
+_PLACEHOLDER_ESSIDS = frozenset({'', 'none', 'null'})
+
+# Request content types whose body Flask parses into request.form
+_FORM_MIMETYPES = frozenset({'application/x-www-form-urlencoded', 'multipart/form-data'})
+
+# One iwlist scan cell, capturing its BSSID and ESSID without running into the next cell
+_IWLIST_CELL_RE = re.compile(r'Cell \d+ - Address:\s*(\S+)(?:(?!Cell \d+ - ).)*?ESSID:"([^"]*)"', re.S)
+
+
+# Pure function of the address, and the same APs show up again and again, so no invalidation is needed
+@functools.lru_cache(maxsize=1024)
+def _normalize_mac(value):
+    """Return value packed into 6 bytes, or None if it is not a MAC address"""
+    # Fast path for the colon notation bettercap reports, parsed without the regex
+    if len(value) == 17 and value[2::3] == ':::::':
+        try:
+            mac = bytes.fromhex(value.replace(':', ' '))
+        except ValueError:
+            return None
+        # fromhex skips whitespace, so a blank octet comes back short and is left to the regex
+        if len(mac) == 6:
+            return mac
+    match = _MAC_RE.match(value.strip())
+    if match:
+        return bytes.fromhex(''.join(match.groups()))
+    return None
+
+
+def _format_mac(mac):
+    """Return a packed MAC address in lowercase colon notation (aa:bb:cc:dd:ee:ff)"""
+    return ':'.join('%02x' % octet for octet in mac)
+
+
+def _normalize_essid(value):
+    """Return the canonical (case-insensitive) form of an ESSID"""
+    return value.strip().lower()
+
+
+def _normalize_entry(entry):
+    """Return the canonical string form of a whitelist entry"""
+    mac = _normalize_mac(entry)
+    if mac:
+        return _format_mac(mac)
+    return _normalize_essid(entry)
+
+
+def _json_response(obj, status=200, headers=None):
+    """Return obj serialized by the fastest available JSON library as a Flask response"""
+    return Response(_json_dumps(obj), status=status, mimetype='application/json', headers=headers)
+
+
+def _accepts_gzip(request):
+    """Return True if the client accepts gzip-encoded responses"""
+    return 'gzip' in request.headers.get('Accept-Encoding', '')
+
+
+def _add_network(networks, network):
+    """Add a discovered network unless one with the same ESSID (ignoring case) is already known"""
+    essid = network['essid']
+    if len(essid) > 1:
+        networks.setdefault(essid.lower(), network)
+
+
+def _extract_entry(request):
+    """Return the stripped 'entry' value of a request from its JSON body, form, raw body or query string"""
+    # The body is read and parsed once, by the parser matching its content type
+    if request.is_json:
+        data = request.get_json(silent=True)
+    elif request.mimetype in _FORM_MIMETYPES:
+        data = request.form
+    else:
+        data = None
+        raw = request.get_data(cache=True)
+        if raw:
+            # JSON sent without a JSON content type
+            try:
+                data = _json_loads(raw)
+            except ValueError as parse_error:
+                logging.debug("[deauth_whitelist] JSON parse error: %s", parse_error)
+    if not data or not isinstance(data, dict):
+        data = request.args
+    entry = data.get('entry', '')
+    return entry.strip() if isinstance(entry, str) else ''
+
 
 class DeauthWhitelist(plugins.Plugin):
     __author__ = 'pwnagotchi-user'
@@ -30,88 +210,303 @@ class DeauthWhitelist(plugins.Plugin):
 
     def __init__(self):
         self.ready = False
+        self._csrf_disabled = False
         self.whitelist_file = '/root/deauth_whitelist.json'
-        self.whitelist = set()
+        self._mac_set = frozenset()
+        self._essid_set = frozenset()
+        self._sorted_cache = None
+        self._list_json_cache = None
+        # ((version, csrf token), markup before, markup after the inline nearby networks) of the last rendered page
+        self._page_cache = None
+        # (((version, csrf token), nearby etag), gzipped page) of the last compressed page
+        self._page_gzip = None
+        # (time.monotonic(), etag, body) of the last /api/nearby response; refreshed by a background thread
+        self._nearby_json_cache = None
+        self._nearby_refreshing = False
+        self._nearby_lock = threading.Lock()
+        self._nearby_first_lock = threading.Lock()
+        self._template = None
+        # Gzipped JSON bodies keyed by ETag
+        self._gzip_cache = {}
+        # Parsed discovery sources, keyed by path and reused while the path's mtime is unchanged
+        self._handshake_cache = {}
+        self._session_cache = {}
+        # Existing discovery directories, resolved in on_loaded
+        self._handshake_dir = None
+        self._session_dirs = None
+        # (time.monotonic() of the scan, networks); refreshed by a background thread
+        self._scan_cache = (float('-inf'), [])
+        self._scan_running = False
+        self._scan_lock = threading.Lock()
+        # Bumped on every change; the random prefix keeps ETags unique across restarts
+        self._version = 0
+        self._etag_prefix = os.urandom(4).hex()
+        # (MAC set, ESSID set) as last loaded from or written to the file
+        self._saved_sets = (frozenset(), frozenset())
+        self._flush_timer = None
+        self._write_lock = threading.Lock()
+        # Blocked deauths waiting to be logged by a background thread
+        self._blocked_log = queue.SimpleQueue()
+        threading.Thread(target=self._blocked_log_worker, args=(self._blocked_log,), daemon=True).start()
         self.load_whitelist()
+        # The flush timer is a daemon thread, so write pending changes if the process exits first
+        atexit.register(self.force_flush)
         
     def on_config_changed(self, config):
         """Called when the configuration is changed"""
-        # Check if a custom whitelist file path is specified
-        if 'whitelist_file' in config:
-            self.whitelist_file = config['whitelist_file']
-            self.load_whitelist()
+        # Check if a custom whitelist file path is specified, in the plugin's section
+        # (main.plugins.deauth_whitelist.whitelist_file) or, as before, at the top level
+        try:
+            options = config['main']['plugins']['deauth_whitelist']
+        except (KeyError, TypeError):
+            options = {}
+        self._use_whitelist_file(options.get('whitelist_file') or config.get('whitelist_file'))
 
     def on_loaded(self):
         """Called when the plugin is loaded"""
-        logging.info("[deauth_whitelist] Plugin loaded")
+        # Mark ready before doing anything else so the web UI is usable right away
         self.ready = True
+        # pwnagotchi sets self.options from main.plugins.deauth_whitelist before calling on_loaded
+        self._use_whitelist_file((getattr(self, 'options', None) or {}).get('whitelist_file'))
+        self._resolve_dirs()
+        logging.info("[deauth_whitelist] Plugin loaded")
+
+    def _use_whitelist_file(self, path):
+        """Switch to a configured whitelist file, if it differs from the current one"""
+        if not path or path == self.whitelist_file:
+            return
+        # Write pending changes to the old file before switching
+        self.force_flush()
+        self.whitelist_file = path
+        self.load_whitelist()
+
+    def on_unload(self, ui):
+        """Called when the plugin is unloaded"""
+        self.force_flush()
+        logging.info("[deauth_whitelist] Plugin unloaded")
 
     def on_ready(self, agent):
         """Called when the agent is ready"""
-        logging.info(f"[deauth_whitelist] Plugin ready with {len(self.whitelist)} whitelisted networks")
+        logging.info(f"[deauth_whitelist] Plugin ready with {self.count()} whitelisted networks")
 
     def on_deauth(self, agent, access_point):
         """Called before a deauth attack - return False to prevent the attack"""
-        if not self.ready:
+        # The whitelist is loaded in __init__, so protection does not wait for on_loaded
+        # Both sets are frozen and replaced on change, so reading them needs no lock
+        mac_set = self._mac_set
+        essid_set = self._essid_set
+        # Nothing can match an empty whitelist, the default for new installs
+        if not mac_set and not essid_set:
             return True
-            
-        # Check if the AP is in the whitelist
-        ap_mac = access_point.get('mac', '').lower()
-        ap_essid = access_point.get('hostname', '') or access_point.get('name', '')
+        # Bind hot lookups to locals, this runs for every deauth attempt
+        get = access_point.get
         
-        # Check both MAC address and ESSID
-        if ap_mac in self.whitelist or ap_essid in self.whitelist:
-            logging.info(f"[deauth_whitelist] Blocking deauth for whitelisted network: {ap_essid} ({ap_mac})")
-            return False
+        # Each check is skipped when its set is empty and a MAC hit skips the ESSID work.
+        if mac_set:
+            mac = get('mac')
+            # MACs are stored packed, so the AP's address is packed the same way (memoized) before probing
+            if mac and _normalize_mac(mac) in mac_set:
+                self._log_blocked(get('hostname') or get('name'), mac)
+                return False
+        if essid_set:
+            # 'name' is only looked up when 'hostname' is missing or empty
+            essid = get('hostname') or get('name')
+            if essid:
+                ap_essid = _normalize_essid(essid)
+                if ap_essid in essid_set:
+                    self._log_blocked(ap_essid, get('mac'))
+                    return False
             
         return True
 
+    def _log_blocked(self, name, mac):
+        """Queue a blocked deauth for logging, so the agent thread never waits on the log file"""
+        self._blocked_log.put((name, mac))
+
+    def _blocked_log_worker(self, blocked):
+        """Write queued blocked deauths to the log"""
+        while True:
+            name, mac = blocked.get()
+            logging.info("[deauth_whitelist] Blocking deauth for whitelisted network: %s (%s)", name, mac)
+
     def load_whitelist(self):
         """Load the whitelist from file"""
-        try:
-            if os.path.exists(self.whitelist_file):
-                with open(self.whitelist_file, 'r') as f:
-                    data = json.load(f)
-                    self.whitelist = set(entry.lower() for entry in data.get('whitelist', []))
-                logging.info(f"[deauth_whitelist] Loaded {len(self.whitelist)} entries from whitelist")
-            else:
-                self.whitelist = set()
-                self.save_whitelist()
-        except Exception as e:
-            logging.error(f"[deauth_whitelist] Error loading whitelist: {e}")
-            self.whitelist = set()
+        with self._write_lock:
+            self._mark_changed()
+            try:
+                # Open directly instead of checking os.path.exists first, saving a stat()
+                try:
+                    with open(self.whitelist_file, 'rb') as f:
+                        raw = f.read()
+                except FileNotFoundError:
+                    raw = None
+                if raw is not None:
+                    if self._text_format():
+                        # One entry per line, no parser needed. Only '\n' separates entries, since
+                        # splitlines() would also break ESSIDs containing \r, \x85, \u2028 and the like
+                        entries = raw.decode('utf-8').split('\n')
+                        macs = essids = ()
+                    else:
+                        data = _json_loads(raw)
+                        # Older versions stored MACs and ESSIDs together under 'whitelist'
+                        entries = data.get('whitelist', [])
+                        macs = data.get('macs', [])
+                        essids = data.get('essids', [])
+                    mac_set = set()
+                    essid_set = set()
+                    for entry in entries:
+                        mac = _normalize_mac(entry)
+                        if mac:
+                            mac_set.add(mac)
+                        else:
+                            essid_set.add(_normalize_essid(entry))
+                    mac_set.update(filter(None, (_normalize_mac(mac) for mac in macs)))
+                    essid_set.update(_normalize_essid(essid) for essid in essids)
+                    # Blank lines are not entries
+                    essid_set.discard('')
+                    self._mac_set = frozenset(mac_set)
+                    self._essid_set = frozenset(essid_set)
+                    logging.info(f"[deauth_whitelist] Loaded {self.count()} entries from whitelist")
+                else:
+                    # Nothing to load; the file is created on the first change
+                    self._mac_set = frozenset()
+                    self._essid_set = frozenset()
+            except Exception as e:
+                logging.error(f"[deauth_whitelist] Error loading whitelist: {e}")
+                self._mac_set = frozenset()
+                self._essid_set = frozenset()
+            self._saved_sets = (self._mac_set, self._essid_set)
 
     def save_whitelist(self):
-        """Save the whitelist to file"""
+        """Save the whitelist to file and return True on success (caller must hold _write_lock)"""
         try:
-            # Get current timestamp - handle different StatusFile API versions
+            # Serialize once and write in a single call; the file is machine-consumed
+            macs = sorted(_format_mac(mac) for mac in self._mac_set)
+            essids = sorted(self._essid_set)
+            if self._text_format():
+                payload = ''.join(entry + '\n' for entry in macs + essids).encode('utf-8')
+            else:
+                # Only the JSON format records a timestamp - handle different StatusFile API versions
+                try:
+                    timestamp = StatusFile.timestamp()
+                except (AttributeError, TypeError):
+                    # Fallback for different Pwnagotchi versions, formatted without building a datetime
+                    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+                payload = _json_dumps({
+                    'macs': macs,
+                    'essids': essids,
+                    'last_updated': timestamp
+                })
+            directory = os.path.dirname(self.whitelist_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Write to a temporary file and swap it in, so a crash never leaves a truncated whitelist
+            tmp_file = self.whitelist_file + '.tmp'
             try:
-                timestamp = StatusFile.timestamp()
-            except (AttributeError, TypeError):
-                # Fallback for different Pwnagotchi versions
-                import datetime
-                timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            data = {
-                'whitelist': list(self.whitelist),
-                'last_updated': timestamp
-            }
-            with open(self.whitelist_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            logging.info(f"[deauth_whitelist] Saved {len(self.whitelist)} entries to whitelist")
+                with open(tmp_file, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.whitelist_file)
+            except OSError:
+                # Don't leave a partial temporary file behind next to the whitelist
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+                raise
+            self._saved_sets = (self._mac_set, self._essid_set)
+            logging.info(f"[deauth_whitelist] Saved {self.count()} entries to whitelist")
+            return True
         except Exception as e:
             logging.error(f"[deauth_whitelist] Error saving whitelist: {e}")
+            return False
+
+    def _text_format(self):
+        """Return True if the whitelist file is plain text with one entry per line instead of JSON"""
+        return self.whitelist_file.endswith('.txt')
+
+    def _mark_changed(self):
+        """Invalidate cached views of the whitelist (caller must hold _write_lock)"""
+        self._sorted_cache = None
+        self._list_json_cache = None
+        self._version += 1
+
+    def _update_sorted(self, name, key, add):
+        """Apply a single add or remove to the sorted whitelist (caller must hold _write_lock)"""
+        cached = self._sorted_cache
+        self._mark_changed()
+        if cached is None:
+            return
+        value = _format_mac(key) if name == '_mac_set' else key
+        # Readers use the cached list without the lock, so change a copy and swap it in
+        cached = list(cached)
+        if add:
+            bisect.insort(cached, value)
+        else:
+            del cached[bisect.bisect_left(cached, value)]
+        self._sorted_cache = cached
+
+    def whitelist_etag(self):
+        """Return an ETag identifying the current whitelist contents"""
+        return f'"{self._etag_prefix}-{self._version}"'
+
+    def _schedule_flush(self):
+        """Schedule a delayed write of the whitelist"""
+        with self._write_lock:
+            # A pending timer will pick up this change as well
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(FLUSH_DELAY, self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush(self):
+        """Write the whitelist to file if it has pending changes"""
+        with self._write_lock:
+            self._flush_timer = None
+            # Only write when the sets differ from the file. Changes that cancel out (add then remove)
+            # are skipped, and a failed save leaves the sets different so the next flush retries.
+            if (self._mac_set, self._essid_set) != self._saved_sets:
+                self.save_whitelist()
+
+    def force_flush(self):
+        """Cancel any pending delayed write and save synchronously"""
+        with self._write_lock:
+            timer = self._flush_timer
+        if timer is not None:
+            timer.cancel()
+        self._flush()
+
+    def _lookup_set(self, entry):
+        """Return the name of the set attribute an entry belongs to together with its normalized key"""
+        mac = _normalize_mac(entry)
+        if mac:
+            return '_mac_set', mac
+        return '_essid_set', _normalize_essid(entry)
+
+    def count(self):
+        """Return the number of whitelisted MAC addresses and ESSIDs"""
+        return len(self._mac_set) + len(self._essid_set)
 
     def add_to_whitelist(self, entry):
         """Add an entry to the whitelist"""
         try:
             if not entry:
                 return False
-            entry_lower = entry.lower()
-            if entry_lower in self.whitelist:
-                return False  # Already exists
-            self.whitelist.add(entry_lower)
-            self.save_whitelist()
+            with self._write_lock:
+                name, key = self._lookup_set(entry)
+                if not key:
+                    return False
+                # The text format stores one entry per line, so it can't hold an ESSID spanning lines
+                if name == '_essid_set' and '\n' in key and self._text_format():
+                    return False
+                entries = getattr(self, name)
+                if key in entries:
+                    return False  # Already exists
+                # Copy on write: readers holding the old set never see it change
+                setattr(self, name, entries | {key})
+                self._update_sorted(name, key, True)
+            self._schedule_flush()
             logging.info(f"[deauth_whitelist] Added '{entry}' to whitelist")
             return True
         except Exception as e:
@@ -123,13 +518,16 @@ class DeauthWhitelist(plugins.Plugin):
         try:
             if not entry:
                 return False
-            entry_lower = entry.lower()
-            if entry_lower in self.whitelist:
-                self.whitelist.remove(entry_lower)
-                self.save_whitelist()
-                logging.info(f"[deauth_whitelist] Removed '{entry}' from whitelist")
-                return True
-            return False
+            with self._write_lock:
+                name, key = self._lookup_set(entry)
+                entries = getattr(self, name)
+                if key not in entries:
+                    return False
+                setattr(self, name, entries - {key})
+                self._update_sorted(name, key, False)
+            self._schedule_flush()
+            logging.info(f"[deauth_whitelist] Removed '{entry}' from whitelist")
+            return True
         except Exception as e:
             logging.error(f"[deauth_whitelist] Error removing from whitelist: {e}")
             return False
@@ -137,242 +535,43 @@ class DeauthWhitelist(plugins.Plugin):
     def get_nearby_networks(self):
         """Get all known networks from Pwnagotchi's data"""
         try:
-            networks = []
-            logging.info("[deauth_whitelist] Starting network discovery...")
+            # Networks keyed by lowercase ESSID, so duplicates across sources are dropped as they arrive
+            networks = {}
+            # Checked once, so diagnostics that build lists or counts are skipped unless they will be shown
+            debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+            logging.debug("[deauth_whitelist] Starting network discovery...")
             
-            # Try to get from the agent's view if available
-            try:
-                import pwnagotchi
-                logging.info(f"[deauth_whitelist] Pwnagotchi module available: {hasattr(pwnagotchi, '_agent')}")
-                if hasattr(pwnagotchi, '_agent') and pwnagotchi._agent:
-                    view = pwnagotchi._agent.view()
-                    logging.info(f"[deauth_whitelist] Agent view type: {type(view)}")
-                    if hasattr(view, 'get'):
-                        state = view.get('state', {})
-                        logging.info(f"[deauth_whitelist] Agent state keys: {list(state.keys())}")
-                        if 'aps' in state:
-                            aps = state.get('aps', {})
-                            logging.info(f"[deauth_whitelist] Found {len(aps)} APs in agent state")
-                            for bssid, ap_data in aps.items():
-                                if isinstance(ap_data, dict):
-                                    essid = ap_data.get('hostname', '') or ap_data.get('name', '') or ap_data.get('essid', '')
-                                    if essid and essid.strip():
-                                        networks.append({
-                                            'essid': essid.strip(),
-                                            'bssid': bssid,
-                                            'channel': ap_data.get('channel', 'Unknown'),
-                                            'rssi': ap_data.get('rssi', 'Unknown'),
-                                            'source': 'agent'
-                                        })
-                                        logging.debug(f"[deauth_whitelist] Added from agent: {essid}")
-                        else:
-                            logging.info("[deauth_whitelist] No 'aps' in agent state")
-                    else:
-                        logging.info("[deauth_whitelist] Agent view has no 'get' method")
-                else:
-                    logging.info("[deauth_whitelist] No agent available")
-            except Exception as e:
-                logging.info(f"[deauth_whitelist] Could not get networks from agent: {e}")
-            
-            # Read from handshakes directory for captured networks
-            try:
-                import os
-                import glob
-                # Try multiple possible handshake directories
-                handshake_dirs = ['/root/handshakes', '/home/pi/handshakes', '/opt/pwnagotchi/handshakes', '/var/lib/pwnagotchi/handshakes']
-                for handshakes_dir in handshake_dirs:
-                    logging.info(f"[deauth_whitelist] Checking handshakes directory: {handshakes_dir}")
-                    if os.path.exists(handshakes_dir):
-                        logging.info(f"[deauth_whitelist] Found handshakes directory: {handshakes_dir}")
-                        pcap_files = glob.glob(os.path.join(handshakes_dir, '*.pcap'))
-                        logging.info(f"[deauth_whitelist] Found {len(pcap_files)} pcap files")
-                        for pcap_file in pcap_files[:50]:  # Limit to avoid performance issues
-                            filename = os.path.basename(pcap_file)
-                            logging.debug(f"[deauth_whitelist] Processing file: {filename}")
-                            # Extract ESSID from filename (format: ESSID_MAC_timestamp.pcap)
-                            parts = filename.replace('.pcap', '').split('_')
-                            if len(parts) >= 2:
-                                essid = parts[0]
-                                if essid and essid not in ['None', 'none', '']:
-                                    networks.append({
-                                        'essid': essid,
-                                        'bssid': parts[1] if len(parts) > 1 else 'Unknown',
-                                        'channel': 'Unknown',
-                                        'rssi': 'Unknown',
-                                        'source': 'handshake'
-                                    })
-                                    logging.debug(f"[deauth_whitelist] Added from handshake: {essid}")
-                        break  # Stop after finding first valid directory
-                    else:
-                        logging.debug(f"[deauth_whitelist] Directory not found: {handshakes_dir}")
-            except Exception as e:
-                logging.info(f"[deauth_whitelist] Could not read handshakes: {e}")
-            
-            # Try to read from potfile for cracked networks
-            try:
-                import os
-                potfile_paths = ['/root/handshakes/wpa-sec.cracked.potfile', '/root/handshakes/*.potfile']
-                for potfile_pattern in potfile_paths:
-                    import glob
-                    for potfile in glob.glob(potfile_pattern):
-                        if os.path.exists(potfile):
-                            with open(potfile, 'r', encoding='utf-8', errors='ignore') as f:
-                                for line in f:
-                                    line = line.strip()
-                                    if ':' in line:
-                                        # Format: hash:password or similar
-                                        parts = line.split(':')
-                                        if len(parts) >= 2:
-                                            # Try to extract network info if available
-                                            # This is a basic extraction, format may vary
-                                            pass
-            except Exception as e:
-                logging.debug(f"[deauth_whitelist] Could not read potfiles: {e}")
-            
-            # Try to read from session files
-            try:
-                import os
-                import glob
-                # Try multiple possible session directories
-                session_dirs = ['/root', '/home/pi', '/opt/pwnagotchi', '/var/lib/pwnagotchi']
-                for session_dir in session_dirs:
-                    logging.info(f"[deauth_whitelist] Checking session directory: {session_dir}")
-                    if os.path.exists(session_dir):
-                        session_files = glob.glob(os.path.join(session_dir, '*.session'))
-                        logging.info(f"[deauth_whitelist] Found {len(session_files)} session files in {session_dir}")
-                        for session_file in session_files[:10]:  # Limit to avoid performance issues
-                            try:
-                                logging.debug(f"[deauth_whitelist] Processing session: {session_file}")
-                                with open(session_file, 'r', encoding='utf-8', errors='ignore') as f:
-                                    import json
-                                    session_data = json.load(f)
-                                    if 'aps' in session_data:
-                                        session_aps = session_data['aps']
-                                        logging.debug(f"[deauth_whitelist] Found {len(session_aps)} APs in session")
-                                        for bssid, ap_info in session_aps.items():
-                                            if isinstance(ap_info, dict):
-                                                essid = ap_info.get('hostname', '') or ap_info.get('name', '') or ap_info.get('essid', '')
-                                                if essid and essid.strip():
-                                                    networks.append({
-                                                        'essid': essid.strip(),
-                                                        'bssid': bssid,
-                                                        'channel': ap_info.get('channel', 'Unknown'),
-                                                        'rssi': ap_info.get('rssi', 'Unknown'),
-                                                        'source': 'session'
-                                                    })
-                                                    logging.debug(f"[deauth_whitelist] Added from session: {essid}")
-                            except Exception as session_error:
-                                logging.debug(f"[deauth_whitelist] Error reading session {session_file}: {session_error}")
-                                continue
-            except Exception as e:
-                logging.info(f"[deauth_whitelist] Could not read session files: {e}")
-            
-            # Try to get current WiFi scan results
-            try:
-                import subprocess
-                logging.info("[deauth_whitelist] Attempting WiFi scan...")
-                # Try iwlist scan
-                try:
-                    result = subprocess.run(['iwlist', 'scan'], capture_output=True, text=True, timeout=10)
-                    if result.returncode == 0:
-                        lines = result.stdout.split('\n')
-                        current_essid = None
-                        current_bssid = None
-                        for line in lines:
-                            line = line.strip()
-                            if 'ESSID:' in line:
-                                essid_part = line.split('ESSID:')[1].strip().strip('"')
-                                if essid_part and essid_part != '':
-                                    current_essid = essid_part
-                            elif 'Address:' in line:
-                                bssid_part = line.split('Address:')[1].strip()
-                                current_bssid = bssid_part
-                            elif 'Cell' in line and current_essid:
-                                if current_essid:
-                                    networks.append({
-                                        'essid': current_essid,
-                                        'bssid': current_bssid or 'Unknown',
-                                        'channel': 'Unknown',
-                                        'rssi': 'Unknown',
-                                        'source': 'scan'
-                                    })
-                                    logging.debug(f"[deauth_whitelist] Added from scan: {current_essid}")
-                                current_essid = None
-                                current_bssid = None
-                        # Add last network if exists
-                        if current_essid:
-                            networks.append({
-                                'essid': current_essid,
-                                'bssid': current_bssid or 'Unknown',
-                                'channel': 'Unknown',
-                                'rssi': 'Unknown',
-                                'source': 'scan'
-                            })
-                            logging.debug(f"[deauth_whitelist] Added from scan: {current_essid}")
-                        logging.info(f"[deauth_whitelist] WiFi scan completed, found networks")
-                except Exception as scan_error:
-                    logging.debug(f"[deauth_whitelist] iwlist scan failed: {scan_error}")
-                    
-                # Try iw scan as fallback
-                try:
-                    result = subprocess.run(['iw', 'dev', 'wlan0', 'scan'], capture_output=True, text=True, timeout=10)
-                    if result.returncode == 0:
-                        lines = result.stdout.split('\n')
-                        for line in lines:
-                            line = line.strip()
-                            if 'SSID:' in line:
-                                essid = line.split('SSID:')[1].strip()
-                                if essid and essid != '':
-                                    networks.append({
-                                        'essid': essid,
-                                        'bssid': 'Unknown',
-                                        'channel': 'Unknown',
-                                        'rssi': 'Unknown',
-                                        'source': 'iw_scan'
-                                    })
-                                    logging.debug(f"[deauth_whitelist] Added from iw scan: {essid}")
-                        logging.info(f"[deauth_whitelist] iw scan completed")
-                except Exception as iw_error:
-                    logging.debug(f"[deauth_whitelist] iw scan failed: {iw_error}")
-                    
-            except Exception as e:
-                logging.info(f"[deauth_whitelist] Could not perform WiFi scan: {e}")
+            # The sources are mostly disk and radio I/O, so query them at the same time.
+            # Results are merged in this order, so an earlier source still wins for duplicate ESSIDs.
+            collectors = (self._collect_agent, self._collect_handshakes, self._collect_sessions, self._scan_networks)
+            with ThreadPoolExecutor(max_workers=len(collectors)) as executor:
+                futures = [executor.submit(collector) for collector in collectors]
+                for future in futures:
+                    for network in future.result():
+                        _add_network(networks, network)
             
             # Add some dummy networks for testing if no networks found
             if len(networks) == 0:
-                logging.info("[deauth_whitelist] No networks found, adding test entries")
+                logging.debug("[deauth_whitelist] No networks found, adding test entries")
                 test_networks = [
                     {'essid': 'TestNetwork1', 'bssid': '00:11:22:33:44:55', 'channel': '6', 'rssi': '-50', 'source': 'test'},
                     {'essid': 'TestNetwork2', 'bssid': '00:11:22:33:44:56', 'channel': '11', 'rssi': '-60', 'source': 'test'},
                     {'essid': 'MyWiFi', 'bssid': '00:11:22:33:44:57', 'channel': '1', 'rssi': '-40', 'source': 'test'}
                 ]
-                networks.extend(test_networks)
+                for network in test_networks:
+                    _add_network(networks, network)
             
-            # Remove duplicates and sort
-            seen_essids = set()
-            unique_networks = []
-            source_counts = {}
+            # The first 50 by ESSID (the lowercase key), selected in one pass instead of sorting everything
+            sorted_networks = [network for _, network in heapq.nsmallest(NEARBY_LIMIT, networks.items())]
             
-            for network in networks:
-                essid_key = network['essid'].lower()
-                if essid_key not in seen_essids and len(network['essid']) > 1:
-                    seen_essids.add(essid_key)
-                    unique_networks.append(network)
-                    # Count sources
+            if debug:
+                source_counts = {}
+                for network in networks.values():
                     source = network['source']
                     source_counts[source] = source_counts.get(source, 0) + 1
-            
-            # Sort by ESSID and limit to reasonable number
-            sorted_networks = sorted(unique_networks, key=lambda x: x['essid'].lower())[:50]
-            
-            logging.info(f"[deauth_whitelist] Network discovery complete:")
-            logging.info(f"[deauth_whitelist] - Total raw entries: {len(networks)}")
-            logging.info(f"[deauth_whitelist] - Unique networks: {len(unique_networks)}")
-            logging.info(f"[deauth_whitelist] - Returned networks: {len(sorted_networks)}")
-            logging.info(f"[deauth_whitelist] - Sources: {source_counts}")
-            
-            if sorted_networks:
-                logging.info(f"[deauth_whitelist] Sample networks: {[net['essid'] for net in sorted_networks[:3]]}")
+                logging.debug("[deauth_whitelist] Network discovery complete: %s unique, %s returned, sources %s, sample %s",
+                              len(networks), len(sorted_networks), source_counts,
+                              [net['essid'] for net in sorted_networks[:3]])
             
             return sorted_networks
             
@@ -380,302 +579,501 @@ class DeauthWhitelist(plugins.Plugin):
             logging.error(f"[deauth_whitelist] Error getting known networks: {e}")
             return []
 
+    def _collect_agent(self):
+        """Return the networks in the running agent's view"""
+        networks = []
+        try:
+            logging.debug("[deauth_whitelist] Pwnagotchi module available: %s", hasattr(pwnagotchi, '_agent'))
+            if hasattr(pwnagotchi, '_agent') and pwnagotchi._agent:
+                view = pwnagotchi._agent.view()
+                logging.debug("[deauth_whitelist] Agent view type: %s", type(view))
+                if hasattr(view, 'get'):
+                    state = view.get('state', {})
+                    if logging.getLogger().isEnabledFor(logging.DEBUG):
+                        logging.debug("[deauth_whitelist] Agent state keys: %s", list(state.keys()))
+                    if 'aps' in state:
+                        aps = state.get('aps', {})
+                        logging.debug("[deauth_whitelist] Found %s APs in agent state", len(aps))
+                        for bssid, ap_data in aps.items():
+                            if isinstance(ap_data, dict):
+                                essid = ap_data.get('hostname', '') or ap_data.get('name', '') or ap_data.get('essid', '')
+                                if essid and essid.strip():
+                                    networks.append({
+                                        'essid': essid.strip(),
+                                        'bssid': bssid,
+                                        'channel': ap_data.get('channel', 'Unknown'),
+                                        'rssi': ap_data.get('rssi', 'Unknown'),
+                                        'source': 'agent'
+                                    })
+                                    logging.debug("[deauth_whitelist] Added from agent: %s", essid)
+                    else:
+                        logging.debug("[deauth_whitelist] No 'aps' in agent state")
+                else:
+                    logging.debug("[deauth_whitelist] Agent view has no 'get' method")
+            else:
+                logging.debug("[deauth_whitelist] No agent available")
+        except Exception as e:
+            logging.info("[deauth_whitelist] Could not get networks from agent: %s", e)
+        return networks
+
+    def _resolve_dirs(self):
+        """Find the handshake and session directories that exist on this device"""
+        self._handshake_dir = next((d for d in HANDSHAKE_DIRS if os.path.isdir(d)), None)
+        self._session_dirs = [d for d in SESSION_DIRS if os.path.isdir(d)]
+        logging.debug("[deauth_whitelist] Handshakes directory: %s, session directories: %s",
+                      self._handshake_dir, self._session_dirs)
+
+    def _collect_handshakes(self):
+        """Return the networks with captured handshakes in the first handshake directory found"""
+        try:
+            # The directory may not exist until the first handshake is captured, so look again until it does
+            if self._handshake_dir is None:
+                self._resolve_dirs()
+            if self._handshake_dir is not None:
+                return self._handshake_networks(self._handshake_dir)
+        except FileNotFoundError:
+            # Moved or deleted since it was found
+            self._handshake_dir = None
+        except Exception as e:
+            logging.info("[deauth_whitelist] Could not read handshakes: %s", e)
+        return []
+
+    def _collect_sessions(self):
+        """Return the networks stored in session files"""
+        networks = []
+        read = set()
+        try:
+            if self._session_dirs is None:
+                self._resolve_dirs()
+            for session_dir in self._session_dirs:
+                # One scandir pass; DirEntry caches its stat(), so ranking by mtime costs one syscall per file.
+                # Dotfiles are skipped, as glob('*.session') did.
+                with os.scandir(session_dir) as entries:
+                    session_files = [entry for entry in entries
+                                     if entry.name.endswith('.session') and not entry.name.startswith('.')]
+                logging.debug("[deauth_whitelist] Found %s session files in %s", len(session_files), session_dir)
+                # Limit to the most recent sessions to avoid performance issues
+                if len(session_files) > SESSION_LIMIT:
+                    session_files = heapq.nlargest(SESSION_LIMIT, session_files, key=lambda entry: entry.stat().st_mtime_ns)
+                for entry in session_files:
+                    session_file = entry.path
+                    read.add(session_file)
+                    try:
+                        networks.extend(self._session_networks(session_file))
+                    except Exception as session_error:
+                        logging.debug("[deauth_whitelist] Error reading session %s: %s", session_file, session_error)
+            # Forget session files that dropped out of the newest SESSION_LIMIT, so the cache doesn't grow with uptime
+            cache = self._session_cache
+            if not cache.keys() <= read:
+                self._session_cache = {path: cached for path, cached in cache.items() if path in read}
+        except Exception as e:
+            logging.info("[deauth_whitelist] Could not read session files: %s", e)
+        return networks
+
+    def _handshake_networks(self, handshakes_dir):
+        """Return the networks named by the pcap files in a directory, cached until the directory changes"""
+        mtime = os.stat(handshakes_dir).st_mtime_ns
+        cached = self._handshake_cache.get(handshakes_dir)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        networks = []
+        count = 0
+        # scandir yields names without building the full listing, so stop as soon as the limit is reached
+        with os.scandir(handshakes_dir) as entries:
+            for entry in entries:
+                filename = entry.name
+                if not filename.endswith('.pcap') or filename.startswith('.'):
+                    continue
+                if count == 50:  # Limit to avoid performance issues
+                    break
+                count += 1
+                logging.debug("[deauth_whitelist] Processing file: %s", filename)
+                # Extract ESSID from filename (format: ESSID_MAC_timestamp.pcap)
+                match = _PCAP_NAME_RE.match(filename)
+                if match:
+                    essid, bssid = match.groups()
+                    if essid.lower() not in _PLACEHOLDER_ESSIDS:
+                        networks.append({
+                            'essid': essid,
+                            'bssid': bssid,
+                            'channel': 'Unknown',
+                            'rssi': 'Unknown',
+                            'source': 'handshake'
+                        })
+                        logging.debug("[deauth_whitelist] Added from handshake: %s", essid)
+        logging.debug("[deauth_whitelist] Read %s pcap files", count)
+        self._handshake_cache[handshakes_dir] = (mtime, networks)
+        return networks
+
+    def _session_networks(self, session_file):
+        """Return the networks stored in a session file, cached until the file changes"""
+        st = os.stat(session_file)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._session_cache.get(session_file)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        networks = []
+        logging.debug("[deauth_whitelist] Processing session: %s", session_file)
+        if ijson is not None:
+            # Stream the file and stop after the 'aps' object instead of loading the whole session
+            with open(session_file, 'rb', buffering=SESSION_READ_BUFFER) as f:
+                session_aps = next(ijson.items(f, 'aps', use_float=True), None)
+        else:
+            # A single read() of the whole file, parsed by the fastest available JSON library
+            with open(session_file, 'rb') as f:
+                session_aps = _json_loads(f.read()).get('aps')
+        if isinstance(session_aps, dict):
+            logging.debug("[deauth_whitelist] Found %s APs in session", len(session_aps))
+            for bssid, ap_info in session_aps.items():
+                if isinstance(ap_info, dict):
+                    essid = ap_info.get('hostname', '') or ap_info.get('name', '') or ap_info.get('essid', '')
+                    if essid and essid.strip():
+                        networks.append({
+                            'essid': essid.strip(),
+                            'bssid': bssid,
+                            'channel': ap_info.get('channel', 'Unknown'),
+                            'rssi': ap_info.get('rssi', 'Unknown'),
+                            'source': 'session'
+                        })
+                        logging.debug("[deauth_whitelist] Added from session: %s", essid)
+        self._session_cache[session_file] = (key, networks)
+        return networks
+
+    def _scan_networks(self):
+        """Return the last WiFi scan result, starting a background rescan once it is older than SCAN_TTL"""
+        with self._scan_lock:
+            scanned_at, networks = self._scan_cache
+            if not self._scan_running and time.monotonic() - scanned_at >= SCAN_TTL:
+                self._scan_running = True
+                threading.Thread(target=self._do_scan, daemon=True).start()
+        return networks
+
+    def _do_scan(self):
+        """Scan for WiFi networks with iwlist and iw and store the result in _scan_cache"""
+        networks = []
+        try:
+            logging.debug("[deauth_whitelist] Attempting WiFi scan...")
+            # Try iwlist scan
+            try:
+                result = subprocess.run(['iwlist', 'scan'], capture_output=True, text=True, timeout=10)
+                if result.returncode == 0:
+                    for match in _IWLIST_CELL_RE.finditer(result.stdout):
+                        bssid, essid = match.groups()
+                        if essid:
+                            networks.append({
+                                'essid': essid,
+                                'bssid': bssid,
+                                'channel': 'Unknown',
+                                'rssi': 'Unknown',
+                                'source': 'scan'
+                            })
+                            logging.debug("[deauth_whitelist] Added from scan: %s", essid)
+                    logging.debug("[deauth_whitelist] WiFi scan completed, found networks")
+            except Exception as scan_error:
+                logging.debug("[deauth_whitelist] iwlist scan failed: %s", scan_error)
+            
+            # Try iw scan as fallback
+            try:
+                result = subprocess.run(['iw', 'dev', 'wlan0', 'scan'], capture_output=True, text=True, timeout=10)
+                if result.returncode == 0:
+                    lines = result.stdout.split('\n')
+                    for line in lines:
+                        line = line.strip()
+                        if line.startswith('SSID:'):
+                            essid = line[5:].strip()
+                            if essid:
+                                networks.append({
+                                    'essid': essid,
+                                    'bssid': 'Unknown',
+                                    'channel': 'Unknown',
+                                    'rssi': 'Unknown',
+                                    'source': 'iw_scan'
+                                })
+                                logging.debug("[deauth_whitelist] Added from iw scan: %s", essid)
+                    logging.debug("[deauth_whitelist] iw scan completed")
+            except Exception as iw_error:
+                logging.debug("[deauth_whitelist] iw scan failed: %s", iw_error)
+        except Exception as e:
+            logging.info("[deauth_whitelist] Could not perform WiFi scan: %s", e)
+        finally:
+            with self._scan_lock:
+                self._scan_cache = (time.monotonic(), networks)
+                self._scan_running = False
+
+    def _conditional_json(self, etag, body):
+        """Return a cacheable JSON response, or an empty 304 if the client already has this ETag"""
+        headers = (('ETag', etag), ('Cache-Control', API_CACHE_CONTROL), ('Vary', 'Accept-Encoding')) + _CORS_HEADERS
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers=headers)
+        body = body()
+        if len(body) >= GZIP_MIN_SIZE and _accepts_gzip(request):
+            # Bodies only change along with their ETag, so each one is compressed once
+            compressed = self._gzip_cache.get(etag)
+            if compressed is None:
+                if len(self._gzip_cache) >= 8:
+                    self._gzip_cache.clear()
+                compressed = self._gzip_cache[etag] = gzip.compress(body, mtime=0)
+            body = compressed
+            headers += (('Content-Encoding', 'gzip'),)
+        return Response(body, status=200, mimetype='application/json', headers=headers)
+
+    def _static_response(self, body, compressed, mimetype):
+        """Return a static asset that browsers may cache until its versioned URL changes"""
+        if _accepts_gzip(request):
+            return Response(compressed, status=200, mimetype=mimetype, headers=_STATIC_HEADERS + _GZIP_HEADERS)
+        return Response(body, status=200, mimetype=mimetype, headers=_STATIC_HEADERS)
+
+    def _bypass_csrf(self, request):
+        """Exempt the plugin webhook view from Flask-WTF CSRF checks, once per process"""
+        if self._csrf_disabled:
+            return
+        try:
+            csrf = current_app.extensions.get('csrf')
+            if csrf is None:
+                # No CSRFProtect on this app, so there is nothing to exempt
+                self._csrf_disabled = True
+                return
+            view = current_app.view_functions.get(request.endpoint)
+            if view is None:
+                # Leave the app's CSRF settings alone; the next request tries again
+                logging.debug("[deauth_whitelist] Could not resolve webhook view %s for CSRF exemption", request.endpoint)
+                return
+            # pwnagotchi serves all plugin webhooks from one shared view, so this exempts every plugin's webhook
+            csrf.exempt(view)
+            self._csrf_disabled = True
+            logging.debug("[deauth_whitelist] Exempted plugin webhooks from CSRF checks")
+        except Exception as e:
+            logging.debug("[deauth_whitelist] Could not exempt webhook from CSRF: %s", e)
+
     def on_webhook(self, path, request):
         """Handle webhook requests for the web interface"""
-        logging.info(f"[deauth_whitelist] Webhook called: path='{path}', method={request.method}")
+        # Per-request chatter and client errors stay at DEBUG with lazy formatting, pwnagotchi logs INFO to the SD card
+        logging.debug("[deauth_whitelist] Webhook called: path='%s', method=%s", path, request.method)
         
         if not FLASK_AVAILABLE:
             logging.error("[deauth_whitelist] Flask not available")
-            return jsonify({'success': False, 'message': 'Flask not available'})
+            return _json_response({'success': False, 'message': 'Flask not available'})
             
         if not self.ready:
             logging.warning("[deauth_whitelist] Plugin not ready")
-            return jsonify({'success': False, 'message': 'Plugin not ready'})
+            return _json_response({'success': False, 'message': 'Plugin not ready'})
             
-        # Force disable CSRF for all API endpoints
-        try:
-            from flask import current_app
-            if hasattr(current_app, 'config'):
-                current_app.config['WTF_CSRF_ENABLED'] = False
-                logging.debug("[deauth_whitelist] Disabled CSRF for current app")
-        except Exception as e:
-            logging.debug(f"[deauth_whitelist] Could not disable CSRF: {e}")
+        # The plugin's API is called from its own page without a CSRF token
+        self._bypass_csrf(request)
         
-        # Disable CSRF protection for this request by monkey-patching
+        # Normalize path - handle None and leading/trailing slashes
+        route = self._ROUTES.get((path or '').strip('/'))
+        if route is None:
+            logging.debug("[deauth_whitelist] Unknown path: %s", path)
+            return _json_response({'success': False, 'message': f'Unknown path: {path}'})
+        
+        methods, handler = route
+        if request.method not in methods:
+            return _json_response({'success': False, 'message': f'Method {request.method} not allowed'}, 405,
+                                  (('Allow', ', '.join(sorted(methods))),))
+        
+        return handler(self, request)
+
+    def _handle_page(self, request):
+        """Serve the main whitelist page"""
         try:
-            from flask import g
-            g._csrf_token = True  # Trick Flask-WTF into thinking CSRF is validated
-        except:
-            pass
+            # Try to get CSRF token for the template
+            csrf_token = ''
+            try:
+                csrf_token = session.get('_csrf_token', '')
+            except:
+                pass
             
-        # Try to disable CSRF checking through various methods
+            if _accepts_gzip(request):
+                return Response(self.render_page(csrf_token, gzipped=True), mimetype='text/html',
+                                headers=_PAGE_HEADERS + _GZIP_HEADERS)
+            return Response(self.render_page(csrf_token), mimetype='text/html', headers=_PAGE_HEADERS)
+        except Exception as e:
+            logging.error("[deauth_whitelist] Template error: %s", e, exc_info=True)
+            return _json_response({'success': False, 'message': 'Template rendering error'})
+
+    def _handle_add(self, request):
+        """Add an entry from a query parameter (GET) or JSON, form or raw body (POST)"""
         try:
-            # Method 1: Set CSRF exempt flag
-            request.csrf_exempt = True
-        except:
-            pass
+            entry = _extract_entry(request)
+            if not entry:
+                logging.debug("[deauth_whitelist] No entry data found in request")
+                return _json_response({'success': False, 'message': 'No data received'}, 400, _CORS_HEADERS)
+            
+            result = self.add_to_whitelist(entry)
+            logging.debug("[deauth_whitelist] Add '%s' result: %s", entry, result)
+            
+            if result:
+                response_data = {'success': True, 'message': f'Added "{entry}" to whitelist',
+                                 'added': _normalize_entry(entry)}
+                status_code = 200
+            else:
+                # The client's list was out of date, so send the current one instead of making it ask
+                response_data = {'success': False, 'message': 'Entry already exists',
+                                 'whitelist': self.get_whitelist()}
+                status_code = 409
             
+            return _json_response(response_data, status_code, _CORS_API_HEADERS)
+            
+        except Exception as e:
+            logging.error("[deauth_whitelist] Add API error: %s", e, exc_info=True)
+            return _json_response({'success': False, 'message': f'Add operation failed: {str(e)}'}, 500, _CORS_HEADERS)
+
+    def _handle_remove(self, request):
+        """Remove an entry sent in the POST body"""
         try:
-            # Method 2: Remove CSRF validation from request
-            if hasattr(request, '_csrf_token'):
-                delattr(request, '_csrf_token')
-        except:
-            pass
-        
-        # Normalize path - handle None and empty string
-        if path is None:
-            path = ''
-        
-        # Handle main page request
-        if path == '' or path == '/':
-            logging.info("[deauth_whitelist] Serving main page")
-            try:
-                # Try to get CSRF token for the template
-                csrf_token = ''
-                try:
-                    from flask import session
-                    csrf_token = session.get('_csrf_token', '')
-                except:
-                    pass
-                
-                return render_template_string(WHITELIST_TEMPLATE, 
-                                            whitelist=self.get_whitelist(),
-                                            csrf_token=csrf_token)
-            except Exception as e:
-                logging.error(f"[deauth_whitelist] Template error: {str(e)}", exc_info=True)
-                return jsonify({'success': False, 'message': 'Template rendering error'})
-        
-        # Handle API requests (with or without leading slash)
-        elif path in ['/api/add', 'api/add']:
-            logging.info(f"[deauth_whitelist] API add request - method: {request.method}")
-            try:
-                # Handle both GET and POST requests to bypass CSRF issues
-                entry = ''
-                
-                if request.method == 'GET':
-                    # GET request with query parameter
-                    entry = request.args.get('entry', '').strip()
-                    logging.info(f"[deauth_whitelist] GET request entry: '{entry}'")
-                elif request.method == 'POST':
-                    # Disable CSRF protection for this endpoint
-                    try:
-                        from flask import g, current_app
-                        g._csrf_token = True
-                        if hasattr(current_app, 'config'):
-                            original_csrf = current_app.config.get('WTF_CSRF_ENABLED', True)
-                            current_app.config['WTF_CSRF_ENABLED'] = False
-                    except:
-                        pass
-                    
-                    # Additional CSRF bypass attempts
-                    try:
-                        # Override Flask-WTF CSRF if available
-                        import sys
-                        if 'flask_wtf.csrf' in sys.modules:
-                            import flask_wtf.csrf
-                            # Temporarily disable CSRF validation
-                            original_validate = getattr(flask_wtf.csrf, 'validate_csrf', None)
-                            if original_validate:
-                                def dummy_validate(*args, **kwargs):
-                                    return True
-                                flask_wtf.csrf.validate_csrf = dummy_validate
-                    except Exception as csrf_override_error:
-                        logging.debug(f"[deauth_whitelist] CSRF override attempt failed: {csrf_override_error}")
-                        pass
-                
-                    logging.info(f"[deauth_whitelist] Request content type: {request.content_type}")
-                    logging.info(f"[deauth_whitelist] Request headers: {dict(request.headers)}")
-                    logging.info(f"[deauth_whitelist] Request data: {request.data}")
-                    logging.info(f"[deauth_whitelist] Request args: {request.args}")
-                    logging.info(f"[deauth_whitelist] Request form: {request.form}")
-                    
-                    # Create response bypassing CSRF
-                    from flask import make_response, current_app
-                    
-                    # Try to temporarily disable CSRF for current app
-                    try:
-                        if hasattr(current_app, 'config'):
-                            original_csrf = current_app.config.get('WTF_CSRF_ENABLED', True)
-                            current_app.config['WTF_CSRF_ENABLED'] = False
-                    except:
-                        pass
-                    
-                    # Try to get data from various sources
-                    if request.json:
-                        logging.info(f"[deauth_whitelist] JSON data: {request.json}")
-                        entry = request.json.get('entry', '').strip()
-                    elif request.form:
-                        logging.info(f"[deauth_whitelist] Form data: {dict(request.form)}")
-                        entry = request.form.get('entry', '').strip()
-                    else:
-                        # Try to parse raw data as JSON
-                        try:
-                            import json as json_lib
-                            raw_data = request.data.decode('utf-8') if request.data else ''
-                            logging.info(f"[deauth_whitelist] Raw data: {raw_data}")
-                            if raw_data:
-                                data = json_lib.loads(raw_data)
-                                entry = data.get('entry', '').strip()
-                        except Exception as parse_error:
-                            logging.info(f"[deauth_whitelist] JSON parse error: {parse_error}")
-
-                if not entry:
-                    logging.warning("[deauth_whitelist] No entry data found in request")
-                    from flask import make_response
-                    response = make_response(jsonify({'success': False, 'message': 'No data received'}), 400)
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Access-Control-Allow-Origin'] = '*'
-                    return response
-                
-                logging.info(f"[deauth_whitelist] Extracted entry: '{entry}'")
-                
-                result = self.add_to_whitelist(entry)
-                logging.info(f"[deauth_whitelist] Add result: {result}")
-                
-                if result:
-                    response_data = {'success': True, 'message': f'Added "{entry}" to whitelist'}
-                    status_code = 200
-                else:
-                    response_data = {'success': False, 'message': 'Entry already exists'}
-                    status_code = 409
-                
-                from flask import make_response
-                response = make_response(jsonify(response_data), status_code)
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Access-Control-Allow-Origin'] = '*'
-                response.headers['Access-Control-Allow-Methods'] = 'POST, GET, OPTIONS'
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Requested-With'
-                
-                # Restore original CSRF setting if we modified it
-                try:
-                    if request.method == 'POST' and hasattr(current_app, 'config') and 'original_csrf' in locals():
-                        current_app.config['WTF_CSRF_ENABLED'] = original_csrf
-                except:
-                    pass
-                
-                return response
-                
-            except Exception as e:
-                logging.error(f"[deauth_whitelist] Add API error: {str(e)}", exc_info=True)
-                from flask import make_response
-                response = make_response(jsonify({'success': False, 'message': f'Add operation failed: {str(e)}'}), 500)
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Access-Control-Allow-Origin'] = '*'
-                return response
-        
-        elif path in ['/api/remove', 'api/remove'] and request.method == 'POST':
-            logging.info("[deauth_whitelist] API remove request")
-            try:
-                # Disable CSRF protection for this endpoint
-                try:
-                    from flask import g, current_app
-                    g._csrf_token = True
-                    if hasattr(current_app, 'config'):
-                        original_csrf = current_app.config.get('WTF_CSRF_ENABLED', True)
-                        current_app.config['WTF_CSRF_ENABLED'] = False
-                except:
-                    pass
-                
-                from flask import make_response
-                
-                # Try to get data from various sources
-                entry = ''
-                if request.json:
-                    entry = request.json.get('entry', '').strip()
-                elif request.form:
-                    entry = request.form.get('entry', '').strip()
-                else:
-                    # Try to parse raw data as JSON
-                    try:
-                        import json as json_lib
-                        raw_data = request.data.decode('utf-8') if request.data else ''
-                        if raw_data:
-                            data = json_lib.loads(raw_data)
-                            entry = data.get('entry', '').strip()
-                    except Exception as parse_error:
-                        logging.info(f"[deauth_whitelist] JSON parse error: {parse_error}")
-
-                if not entry:
-                    response = make_response(jsonify({'success': False, 'message': 'No data received'}), 400)
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Access-Control-Allow-Origin'] = '*'
-                    return response
-                    
-                result = self.remove_from_whitelist(entry)
-                if result:
-                    response_data = {'success': True, 'message': f'Removed "{entry}" from whitelist'}
-                    status_code = 200
-                else:
-                    response_data = {'success': False, 'message': 'Entry not found'}
-                    status_code = 404
-                
-                response = make_response(jsonify(response_data), status_code)
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Access-Control-Allow-Origin'] = '*'
-                response.headers['Access-Control-Allow-Methods'] = 'POST, GET, OPTIONS'
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Requested-With'
-                
-                # Restore original CSRF setting
-                try:
-                    if hasattr(current_app, 'config') and 'original_csrf' in locals():
-                        current_app.config['WTF_CSRF_ENABLED'] = original_csrf
-                except:
-                    pass
-                
-                return response
+            entry = _extract_entry(request)
+            if not entry:
+                return _json_response({'success': False, 'message': 'No data received'}, 400, _CORS_HEADERS)
                 
-            except Exception as e:
-                logging.error(f"[deauth_whitelist] Remove API error: {str(e)}", exc_info=True)
-                from flask import make_response
-                response = make_response(jsonify({'success': False, 'message': 'Remove operation failed'}), 500)
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Access-Control-Allow-Origin'] = '*'
-                return response
-        
-        elif path in ['/api/list', 'api/list']:
-            logging.info("[deauth_whitelist] API list request")
-            try:
-                from flask import make_response
-                response = make_response(jsonify({'whitelist': self.get_whitelist()}), 200)
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Access-Control-Allow-Origin'] = '*'
-                return response
-            except Exception as e:
-                logging.error(f"[deauth_whitelist] List API error: {str(e)}", exc_info=True)
-                from flask import make_response
-                response = make_response(jsonify({'success': False, 'message': 'List operation failed'}), 500)
-                response.headers['Content-Type'] = 'application/json'
-                return response
-        
-        elif path in ['/api/nearby', 'api/nearby']:
-            logging.info("[deauth_whitelist] API nearby networks request")
-            try:
-                from flask import make_response
-                response = make_response(jsonify({'networks': self.get_nearby_networks()}), 200)
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Access-Control-Allow-Origin'] = '*'
-                return response
-            except Exception as e:
-                logging.error(f"[deauth_whitelist] Nearby API error: {str(e)}", exc_info=True)
-                from flask import make_response
-                response = make_response(jsonify({'success': False, 'message': 'Nearby networks operation failed'}), 500)
-                response.headers['Content-Type'] = 'application/json'
-                return response
-        
-        else:
-            # Unknown path
-            logging.warning(f"[deauth_whitelist] Unknown path: {path}")
-            return jsonify({'success': False, 'message': f'Unknown path: {path}'})
+            result = self.remove_from_whitelist(entry)
+            if result:
+                response_data = {'success': True, 'message': f'Removed "{entry}" from whitelist',
+                                 'removed': _normalize_entry(entry)}
+                status_code = 200
+            else:
+                response_data = {'success': False, 'message': 'Entry not found',
+                                 'whitelist': self.get_whitelist()}
+                status_code = 404
+            
+            return _json_response(response_data, status_code, _CORS_API_HEADERS)
+            
+        except Exception as e:
+            logging.error("[deauth_whitelist] Remove API error: %s", e, exc_info=True)
+            return _json_response({'success': False, 'message': 'Remove operation failed'}, 500, _CORS_HEADERS)
+
+    def _handle_list(self, request):
+        """Return the whitelist, honouring If-None-Match"""
+        try:
+            # The version ETag is known without serializing, so a revalidation never builds the body
+            return self._conditional_json(self.whitelist_etag(), self.get_whitelist_json)
+        except Exception as e:
+            logging.error("[deauth_whitelist] List API error: %s", e, exc_info=True)
+            response = _json_response({'success': False, 'message': 'List operation failed'}, 500)
+            return response
+
+    def _handle_nearby(self, request):
+        """Return the nearby networks, honouring If-None-Match"""
+        try:
+            etag, body = self.get_nearby_json()
+            return self._conditional_json(etag, lambda: body)
+        except Exception as e:
+            logging.error("[deauth_whitelist] Nearby API error: %s", e, exc_info=True)
+            response = _json_response({'success': False, 'message': 'Nearby networks operation failed'}, 500)
+            return response
+
+    def _handle_css(self, request):
+        """Serve the web interface stylesheet"""
+        return self._static_response(_CSS_BYTES, _CSS_GZIP, 'text/css')
+
+    def _handle_js(self, request):
+        """Serve the web interface script"""
+        return self._static_response(_JS_BYTES, _JS_GZIP, 'application/javascript')
+
+    # Normalized webhook path -> (allowed methods, handler). Flask answers HEAD through the GET
+    # view, so read-only routes accept it too; api/add changes state and is left out.
+    _ROUTES = {
+        '': (frozenset(('GET', 'HEAD')), _handle_page),
+        'api/add': (frozenset(('GET', 'POST')), _handle_add),
+        'api/remove': (frozenset(('POST',)), _handle_remove),
+        'api/list': (frozenset(('GET', 'HEAD')), _handle_list),
+        'api/nearby': (frozenset(('GET', 'HEAD')), _handle_nearby),
+        'static/app.css': (frozenset(('GET', 'HEAD')), _handle_css),
+        'static/app.js': (frozenset(('GET', 'HEAD')), _handle_js),
+    }
 
 
     def get_whitelist(self):
-        """Get the current whitelist"""
+        """Get the current whitelist as a sorted list (shared, do not modify)"""
         try:
-            return sorted(list(self.whitelist))
+            # Cached lists are never modified, only replaced, so a hit needs no lock
+            cached = self._sorted_cache
+            if cached is not None:
+                return cached
+            with self._write_lock:
+                return self._sorted_view()
         except Exception as e:
             logging.error(f"[deauth_whitelist] Error getting whitelist: {e}")
             return []
 
+    def render_page(self, csrf_token='', gzipped=False):
+        """Render the web interface as UTF-8 (or gzipped) bytes, reusing the rendered markup while the whitelist and CSRF token are unchanged"""
+        nearby_etag, nearby_body = self.get_nearby_json()
+        # Read the version before the list, so a concurrent change can only make the cached key stale
+        key = (self._version, csrf_token)
+        cached = self._page_cache
+        if cached is None or cached[0] != key:
+            if self._template is None:
+                # Parse and compile the template once with the app's Jinja environment
+                self._template = current_app.jinja_env.from_string(WHITELIST_TEMPLATE)
+            html = self._template.render(whitelist=self.get_whitelist(), initial=Markup(_INITIAL_PLACEHOLDER),
+                                         css_version=CSS_VERSION, js_version=JS_VERSION,
+                                         csrf_token=csrf_token).encode('utf-8')
+            # The nearby networks change far more often than the markup, so they are spliced in per request.
+            # Split at the last occurrence: the script comes after the whitelist rows, which are user data.
+            prefix, suffix = html.rsplit(_INITIAL_PLACEHOLDER.encode('utf-8'), 1)
+            cached = self._page_cache = (key, prefix, suffix)
+        # The nearby networks ship inline, so the page does not fetch /api/nearby on load.
+        # <, > and & only occur inside JSON strings, where the escapes keep the script block intact.
+        initial = nearby_body.replace(b'<', b'\\u003c').replace(b'>', b'\\u003e').replace(b'&', b'\\u0026')
+        html = cached[1] + initial + cached[2]
+        if not gzipped:
+            return html
+        # Compressed only when a client asks for it, and reused until the markup or nearby networks change
+        gzip_key = (key, nearby_etag)
+        compressed = self._page_gzip
+        if compressed is None or compressed[0] != gzip_key:
+            compressed = self._page_gzip = (gzip_key, gzip.compress(html, 6, mtime=0))
+        return compressed[1]
+
+    def get_nearby_json(self):
+        """Get the /api/nearby response body and its ETag, refreshing them in the background once older than NEARBY_TTL"""
+        cached = self._nearby_json_cache
+        if cached is None:
+            # Nothing to serve yet, so only the first requests wait, sharing one discovery pass
+            with self._nearby_first_lock:
+                cached = self._nearby_json_cache
+                if cached is None:
+                    return self._refresh_nearby_json()
+            return cached[1], cached[2]
+        if time.monotonic() - cached[0] >= NEARBY_TTL:
+            with self._nearby_lock:
+                if not self._nearby_refreshing:
+                    self._nearby_refreshing = True
+                    threading.Thread(target=self._refresh_nearby_json, daemon=True).start()
+        return cached[1], cached[2]
+
+    def _refresh_nearby_json(self):
+        """Discover nearby networks and cache the /api/nearby body and ETag"""
+        try:
+            networks = self.get_nearby_networks()
+            if networks:
+                body = _json_dumps({'networks': networks})
+                # Derived from the content, so an unchanged list revalidates even after the cache expires
+                etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+            else:
+                body, etag = _EMPTY_NEARBY_JSON, _EMPTY_NEARBY_ETAG
+            self._nearby_json_cache = (time.monotonic(), etag, body)
+            return etag, body
+        finally:
+            with self._nearby_lock:
+                self._nearby_refreshing = False
+
+    def get_whitelist_json(self):
+        """Get the /api/list response body as JSON bytes, serialized once per change"""
+        with self._write_lock:
+            if self._list_json_cache is None:
+                whitelist = self._sorted_view()
+                self._list_json_cache = _json_dumps({'whitelist': whitelist}) if whitelist else _EMPTY_LIST_JSON
+            return self._list_json_cache
+
+    def _sorted_view(self):
+        """Return the cached sorted whitelist (caller must hold _write_lock)"""
+        # Sorted in full only after a load, adds and removes keep the list sorted in place
+        if self._sorted_cache is None:
+            self._sorted_cache = sorted([_format_mac(mac) for mac in self._mac_set] + list(self._essid_set))
+        return self._sorted_cache
+
 
 # HTML template for the web interface
 WHITELIST_TEMPLATE = """
@@ -686,7 +1084,68 @@ WHITELIST_TEMPLATE = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <meta name="csrf-token" content="{{ csrf_token() if csrf_token else '' }}">
     <title>Deauth Whitelist - Pwnagotchi</title>
-    <style>
+    <link rel="stylesheet" href="/plugins/deauth_whitelist/static/app.css?v={{ css_version }}">
+</head>
+<body>
+    <div class="container">
+        <h1>🛡️ Deauth Whitelist Manager</h1>
+        
+        <div class="add-form">
+            <h3>Add Network to Whitelist</h3>
+            <input type="text" id="entryInput" placeholder="Enter MAC address (aa:bb:cc:dd:ee:ff) or ESSID">
+            <button onclick="addEntry()">Add Entry</button>
+            <div class="help-text">
+                💡 You can add either MAC addresses (e.g., aa:bb:cc:dd:ee:ff) or network names (ESSID).
+                Networks in this list will be protected from deauth attacks.
+            </div>
+        </div>
+        
+        <div id="message"></div>
+        
+        <div class="whitelist-container">
+            <h3>Alle bekannten Netzwerke</h3>
+            <div id="nearbyNetworks">
+                <div style="text-align: center; color: #888; padding: 20px;">
+                    Lade bekannte Netzwerke...
+                </div>
+            </div>
+            <button onclick="refreshNearbyNetworks()" class="refresh-btn">🔄 Netzwerke aktualisieren</button>
+            <div class="help-text">
+                📡 Diese Liste zeigt alle Netzwerke, die von Ihrem Pwnagotchi entdeckt wurden - aus Sessions, Handshakes, Logs und aktuellen Scans.
+            </div>
+        </div>
+        
+        <div class="whitelist-container">
+            <h3>Current Whitelist (<span id="whitelistCount">{{ whitelist|length }}</span> entries)</h3>
+            <div id="whitelistItems">
+                {% if whitelist %}
+                    {% for entry in whitelist %}
+                    {% set escaped = entry|e %}
+                    <div class="whitelist-item">
+                        <span>{{ escaped }}</span>
+                        <button class="remove-btn" data-entry="{{ escaped }}">Remove</button>
+                    </div>
+                    {% endfor %}
+                {% else %}
+                    <div style="text-align: center; color: #888; padding: 20px;">
+                        No entries in whitelist. Add some networks to protect them from deauth attacks.
+                    </div>
+                {% endif %}
+            </div>
+        </div>
+    </div>
+
+    <script>
+        // Data for the first paint, later refreshes go through the API
+        window.__INITIAL__ = {{ initial }};
+    </script>
+    <script src="/plugins/deauth_whitelist/static/app.js?v={{ js_version }}" defer></script>
+</body>
+</html>
+"""
+
+# Stylesheet and script of the web interface, served from versioned URLs so browsers cache them for good
+WHITELIST_CSS = """
         body {
             font-family: 'Courier New', monospace;
             background-color: #000;
@@ -848,57 +1307,9 @@ WHITELIST_TEMPLATE = """
             background-color: #0f0;
             color: #000;
         }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🛡️ Deauth Whitelist Manager</h1>
-        
-        <div class="add-form">
-            <h3>Add Network to Whitelist</h3>
-            <input type="text" id="entryInput" placeholder="Enter MAC address (aa:bb:cc:dd:ee:ff) or ESSID">
-            <button onclick="addEntry()">Add Entry</button>
-            <div class="help-text">
-                💡 You can add either MAC addresses (e.g., aa:bb:cc:dd:ee:ff) or network names (ESSID).
-                Networks in this list will be protected from deauth attacks.
-            </div>
-        </div>
-        
-        <div id="message"></div>
-        
-        <div class="whitelist-container">
-            <h3>Alle bekannten Netzwerke</h3>
-            <div id="nearbyNetworks">
-                <div style="text-align: center; color: #888; padding: 20px;">
-                    Lade bekannte Netzwerke...
-                </div>
-            </div>
-            <button onclick="refreshNearbyNetworks()" class="refresh-btn">🔄 Netzwerke aktualisieren</button>
-            <div class="help-text">
-                📡 Diese Liste zeigt alle Netzwerke, die von Ihrem Pwnagotchi entdeckt wurden - aus Sessions, Handshakes, Logs und aktuellen Scans.
-            </div>
-        </div>
-        
-        <div class="whitelist-container">
-            <h3>Current Whitelist ({{ whitelist|length }} entries)</h3>
-            <div id="whitelistItems">
-                {% if whitelist %}
-                    {% for entry in whitelist %}
-                    <div class="whitelist-item">
-                        <span>{{ entry }}</span>
-                        <button class="remove-btn" data-entry="{{ entry }}" onclick="removeEntryByButton(this)">Remove</button>
-                    </div>
-                    {% endfor %}
-                {% else %}
-                    <div style="text-align: center; color: #888; padding: 20px;">
-                        No entries in whitelist. Add some networks to protect them from deauth attacks.
-                    </div>
-                {% endif %}
-            </div>
-        </div>
-    </div>
+"""
 
-    <script>
+WHITELIST_JS = """
         // All function declarations are hoisted, so they can be called before definition
         
         // Get CSRF token from meta tag or cookie
@@ -981,43 +1392,139 @@ WHITELIST_TEMPLATE = """
 
         function showMessage(text, type) {
             const messageDiv = document.getElementById('message');
-            messageDiv.innerHTML = '<div class="message ' + type + '">' + text + '</div>';
+            const message = document.createElement('div');
+            message.className = 'message ' + type;
+            // Messages echo user supplied entries, never parse them as HTML
+            message.textContent = text;
+            messageDiv.replaceChildren(message);
             setTimeout(function() {
                 messageDiv.innerHTML = '';
             }, 3000);
         }
 
+        function createElement(tag, className, text) {
+            const element = document.createElement(tag);
+            element.className = className;
+            if (text !== undefined) {
+                element.textContent = text;
+            }
+            return element;
+        }
+
+        // ESSIDs come from the air, so they are only ever set as text or dataset values
+        function createNearbyNetwork(network) {
+            const row = createElement('div', 'nearby-network');
+            const info = createElement('div', 'network-info');
+            info.appendChild(createElement('div', 'network-essid', network.essid));
+            info.appendChild(createElement('div', 'network-details', 'BSSID: ' + network.bssid + ' | Kanal: ' + network.channel + ' | Signal: ' + network.rssi + ' | Quelle: ' + (network.source || 'unknown')));
+            const button = createElement('button', 'add-nearby-btn', 'Zur Whitelist hinzufügen');
+            button.dataset.essid = network.essid;
+            button.hidden = isWhitelisted(network.essid);
+            row.appendChild(info);
+            row.appendChild(button);
+            return row;
+        }
+
+        const EMPTY_WHITELIST_HTML = '<div style="text-align: center; color: #888; padding: 20px;">No entries in whitelist. Add some networks to protect them from deauth attacks.</div>';
+
+        // Displayed whitelist rows keyed by entry, so lookups and removals need no scan of the list
+        const whitelistRows = new Map();
+
+        function isWhitelisted(essid) {
+            return whitelistRows.has(essid.trim().toLowerCase());
+        }
+
+        // Update the count and hide the add button of nearby networks that are already whitelisted
+        function updateWhitelistCount() {
+            document.getElementById('whitelistCount').textContent = whitelistRows.size;
+            const buttons = document.querySelectorAll('#nearbyNetworks .add-nearby-btn');
+            for (let i = 0; i < buttons.length; i++) {
+                buttons[i].hidden = isWhitelisted(buttons[i].dataset.essid);
+            }
+        }
+
+        // Insert a single entry at its sorted position instead of reloading the whole list
+        function insertWhitelistItem(entry) {
+            const container = document.getElementById('whitelistItems');
+            const buttons = container.querySelectorAll('.remove-btn');
+            if (buttons.length === 0) {
+                container.textContent = '';
+            }
+            let before = null;
+            for (let i = 0; i < buttons.length; i++) {
+                if (buttons[i].dataset.entry > entry) {
+                    before = buttons[i].parentNode;
+                    break;
+                }
+            }
+            const item = createWhitelistItem(entry);
+            container.insertBefore(item, before);
+            whitelistRows.set(entry, item);
+            updateWhitelistCount();
+        }
+
+        function removeWhitelistItem(entry) {
+            const row = whitelistRows.get(entry);
+            if (row) {
+                row.remove();
+                whitelistRows.delete(entry);
+            }
+            if (whitelistRows.size === 0) {
+                document.getElementById('whitelistItems').innerHTML = EMPTY_WHITELIST_HTML;
+            }
+            updateWhitelistCount();
+        }
+
+        function createWhitelistItem(entry) {
+            const item = createElement('div', 'whitelist-item');
+            item.appendChild(createElement('span', '', entry));
+            const button = createElement('button', 'remove-btn', 'Remove');
+            button.dataset.entry = entry;
+            item.appendChild(button);
+            return item;
+        }
+
+        function renderNearbyNetworks(networks) {
+            const container = document.getElementById('nearbyNetworks');
+            if (networks && networks.length > 0) {
+                // Build the rows off-document and attach them in one go
+                const fragment = document.createDocumentFragment();
+                for (let i = 0; i < networks.length; i++) {
+                    fragment.appendChild(createNearbyNetwork(networks[i]));
+                }
+                container.textContent = '';
+                container.appendChild(fragment);
+            } else {
+                container.innerHTML = '<div style="text-align: center; color: #888; padding: 20px;">Keine bekannten Netzwerke gefunden. Netzwerke erscheinen hier, sobald sie entdeckt werden.</div>';
+            }
+        }
+
+        // Requests still running, so repeated clicks share them instead of starting new ones
+        let nearbyInflight = null;
+        let whitelistInflight = null;
+
         function refreshNearbyNetworks() {
+            if (nearbyInflight) {
+                return nearbyInflight;
+            }
             const container = document.getElementById('nearbyNetworks');
             container.innerHTML = '<div style="text-align: center; color: #888; padding: 20px;">Lade bekannte Netzwerke...</div>';
             
-            fetch('/plugins/deauth_whitelist/api/nearby')
+            nearbyInflight = fetch('/plugins/deauth_whitelist/api/nearby')
             .then(function(response) {
                 return response.json();
             })
             .then(function(data) {
-                if (data.networks && data.networks.length > 0) {
-                    let html = '';
-                    for (let i = 0; i < data.networks.length; i++) {
-                        const network = data.networks[i];
-                        const essid = network.essid.replace(/"/g, '&quot;').replace(/'/g, '&#39;');
-                        html += '<div class="nearby-network">';
-                        html += '<div class="network-info">';
-                        html += '<div class="network-essid">' + essid + '</div>';
-                        html += '<div class="network-details">BSSID: ' + network.bssid + ' | Kanal: ' + network.channel + ' | Signal: ' + network.rssi + ' | Quelle: ' + (network.source || 'unknown') + '</div>';
-                        html += '</div>';
-                        html += '<button class="add-nearby-btn" data-essid="' + essid + '" onclick="addNearbyNetworkByButton(this)">Zur Whitelist hinzufügen</button>';
-                        html += '</div>';
-                    }
-                    container.innerHTML = html;
-                } else {
-                    container.innerHTML = '<div style="text-align: center; color: #888; padding: 20px;">Keine bekannten Netzwerke gefunden. Netzwerke erscheinen hier, sobald sie entdeckt werden.</div>';
-                }
+                renderNearbyNetworks(data.networks);
             })
             .catch(function(error) {
                 console.error('Error refreshing known networks:', error);
                 container.innerHTML = '<div style="text-align: center; color: #f00; padding: 20px;">Fehler beim Laden der bekannten Netzwerke. Prüfen Sie die Konsole für Details.</div>';
+            })
+            .finally(function() {
+                nearbyInflight = null;
             });
+            return nearbyInflight;
         }
 
         function addEntry() {
@@ -1037,9 +1544,11 @@ WHITELIST_TEMPLATE = """
                 if (data.success) {
                     showMessage(data.message, 'success');
                     input.value = '';
-                    refreshWhitelist();
+                    insertWhitelistItem(data.added);
                 } else {
                     showMessage(data.message || 'Unknown error', 'error');
+                    // The displayed list is out of date, the response carries the current one
+                    syncWhitelist(data);
                 }
             })
             .catch(function(error) {
@@ -1057,9 +1566,10 @@ WHITELIST_TEMPLATE = """
             .then(function(data) {
                 if (data.success) {
                     showMessage(data.message, 'success');
-                    refreshWhitelist();
+                    removeWhitelistItem(data.removed);
                 } else {
                     showMessage(data.message, 'error');
+                    syncWhitelist(data);
                 }
             })
             .catch(function(error) {
@@ -1068,36 +1578,52 @@ WHITELIST_TEMPLATE = """
             });
         }
 
-        function removeEntryByButton(button) {
-            const entry = button.getAttribute('data-entry');
-            removeEntry(entry);
+        function renderWhitelist(whitelist) {
+            const container = document.getElementById('whitelistItems');
+            whitelistRows.clear();
+            if (whitelist.length > 0) {
+                const fragment = document.createDocumentFragment();
+                for (let i = 0; i < whitelist.length; i++) {
+                    const item = createWhitelistItem(whitelist[i]);
+                    whitelistRows.set(whitelist[i], item);
+                    fragment.appendChild(item);
+                }
+                container.textContent = '';
+                container.appendChild(fragment);
+            } else {
+                container.innerHTML = EMPTY_WHITELIST_HTML;
+            }
+            updateWhitelistCount();
+        }
+
+        // Render the whitelist sent with a failed add or remove, reloading it only if the response has none
+        function syncWhitelist(data) {
+            if (data.whitelist) {
+                renderWhitelist(data.whitelist);
+            } else {
+                refreshWhitelist();
+            }
         }
 
         function refreshWhitelist() {
-            fetch('/plugins/deauth_whitelist/api/list')
+            if (whitelistInflight) {
+                return whitelistInflight;
+            }
+            // Always revalidate; the browser sends If-None-Match and reuses its copy on 304
+            whitelistInflight = fetch('/plugins/deauth_whitelist/api/list', {cache: 'no-cache'})
             .then(function(response) {
                 return response.json();
             })
             .then(function(data) {
-                const container = document.getElementById('whitelistItems');
-                if (data.whitelist.length > 0) {
-                    let html = '';
-                    for (let i = 0; i < data.whitelist.length; i++) {
-                        const entry = data.whitelist[i];
-                        const safeEntry = entry.replace(/'/g, '&#39;').replace(/"/g, '&quot;');
-                        html += '<div class="whitelist-item">';
-                        html += '<span>' + safeEntry + '</span>';
-                        html += '<button class="remove-btn" data-entry="' + safeEntry + '" onclick="removeEntryByButton(this)">Remove</button>';
-                        html += '</div>';
-                    }
-                    container.innerHTML = html;
-                } else {
-                    container.innerHTML = '<div style="text-align: center; color: #888; padding: 20px;">No entries in whitelist. Add some networks to protect them from deauth attacks.</div>';
-                }
+                renderWhitelist(data.whitelist);
             })
             .catch(function(error) {
                 console.error('Error refreshing whitelist:', error);
+            })
+            .finally(function() {
+                whitelistInflight = null;
             });
+            return whitelistInflight;
         }
 
         function addNearbyNetwork(essid) {
@@ -1108,9 +1634,11 @@ WHITELIST_TEMPLATE = """
                 console.log('Response data:', data);
                 if (data.success) {
                     showMessage(data.message, 'success');
-                    refreshWhitelist();
+                    insertWhitelistItem(data.added);
                 } else {
                     showMessage(data.message || 'Unknown error', 'error');
+                    // The displayed list is out of date, the response carries the current one
+                    syncWhitelist(data);
                 }
             })
             .catch(function(error) {
@@ -1119,11 +1647,6 @@ WHITELIST_TEMPLATE = """
             });
         }
 
-        function addNearbyNetworkByButton(button) {
-            const essid = button.getAttribute('data-essid');
-            addNearbyNetwork(essid);
-        }
-
         // Event listeners
         document.addEventListener('DOMContentLoaded', function() {
             // Allow Enter key to add entry
@@ -1133,10 +1656,39 @@ WHITELIST_TEMPLATE = """
                 }
             });
             
-            // Load networks on page load
-            refreshNearbyNetworks();
+            // One delegated listener per list instead of an inline handler per button
+            document.getElementById('whitelistItems').addEventListener('click', function(e) {
+                const button = e.target.closest('.remove-btn');
+                if (button) {
+                    removeEntry(button.dataset.entry);
+                }
+            });
+            document.getElementById('nearbyNetworks').addEventListener('click', function(e) {
+                const button = e.target.closest('.add-nearby-btn');
+                if (button) {
+                    addNearbyNetwork(button.dataset.essid);
+                }
+            });
+            
+            // The whitelist is rendered server-side, so take its entries from the page
+            const entries = document.querySelectorAll('#whitelistItems .remove-btn');
+            for (let i = 0; i < entries.length; i++) {
+                whitelistRows.set(entries[i].dataset.entry, entries[i].parentNode);
+            }
+            
+            // Show the networks rendered into the page, only fetch them if they are missing
+            if (window.__INITIAL__) {
+                renderNearbyNetworks(window.__INITIAL__.networks);
+            } else {
+                refreshNearbyNetworks();
+            }
         });
-    </script>
-</body>
-</html>
 """
+
+_CSS_BYTES = WHITELIST_CSS.encode('utf-8')
+_JS_BYTES = WHITELIST_JS.encode('utf-8')
+_CSS_GZIP = gzip.compress(_CSS_BYTES, 9, mtime=0)
+_JS_GZIP = gzip.compress(_JS_BYTES, 9, mtime=0)
+# Content hashes used as the assets' URL versions, so any change gets a new URL
+CSS_VERSION = hashlib.blake2b(_CSS_BYTES, digest_size=8).hexdigest()
+JS_VERSION = hashlib.blake2b(_JS_BYTES, digest_size=8).hexdigest()
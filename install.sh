@@ -75,7 +75,8 @@ if [[ ! -f "$WHITELIST_FILE" ]]; then
     echo "📝 Creating empty whitelist file..."
     cat > "$WHITELIST_FILE" << EOF
 {
-  "whitelist": [],
+  "macs": [],
+  "essids": [],
   "last_updated": "$(date '+%Y-%m-%d %H:%M:%S')"
 }
 EOF